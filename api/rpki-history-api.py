@@ -1,12 +1,21 @@
+import asyncio
 import ipaddress
 import os
+import socket
+import threading
+import time
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Tuple
+from urllib.parse import urlencode
 
+from cachetools import TTLCache
 import falcon
+import falcon.asgi
+import orjson
 import psycopg
-import psycopg.sql as sql
 from psycopg.types.range import Range
+from psycopg_pool import AsyncConnectionPool
 from swagger_ui import falcon_api_doc
 
 db_host = os.environ['POSTGRES_HOST']
@@ -16,49 +25,121 @@ with open('/run/secrets/postgres-ro-pw', 'r') as f:
     db_password = f.read()
 custom_location = os.environ.get('CUSTOM_LOCATION', default='').rstrip('/')
 
-# These are the column names which should be retrieved from the database.
-vrp_dict_fields = ['prefix', 'asn', 'max_length', 'visible']
-
+conn_kwargs = {
+    'host': db_host,
+    'dbname': db_dbname,
+    'user': db_user,
+    'password': db_password,
+    'autocommit': True
+}
+# POSTGRES_HOST can be a Unix socket directory (starting with /) for local
+# deployments, which skips the TCP stack entirely. For TCP hosts, resolve the name once
+# at startup so new pool connections skip the DNS lookup, and enable keepalives so idle
+# pool connections are not silently dropped, which would make the first query of a
+# burst pay a full reconnect.
+if not db_host.startswith('/'):
+    try:
+        conn_kwargs['hostaddr'] = socket.gethostbyname(db_host)
+    except OSError:
+        # Fall back to per-connection resolution.
+        pass
+    conn_kwargs.update({
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'keepalives_interval': 10,
+        'keepalives_count': 3
+    })
+
+# One pool shared by all resources. Connections are acquired per request, so
+# concurrent requests do not serialize on a single socket and dropped connections
+# are replaced automatically. max_lifetime recycles stale server-side sessions. The
+# pool is opened from the ASGI lifespan handler since it needs a running event loop.
+pool = AsyncConnectionPool(
+    kwargs=conn_kwargs,
+    min_size=4,
+    max_size=16,
+    timeout=30,
+    max_lifetime=1800,
+    open=False
+)
 
-def rows_to_vrp(c: psycopg.Cursor) -> list:
-    """Convert the rows from the current result set of the cursor to a list of VRPs.
 
-    Each VRP is in a dictionary containing fields specified by vrp_dict_fields.
+class ConnectionPoolMiddleware:
+    """Open the shared connection pool on application startup and close it on
+    shutdown.
     """
-    if c.description is None:
-        return list()
-    # To be robust against changes in the database schema and/or reordering of columns,
-    # use a index map.
-    cn_idx = {column.name: idx for idx, column in enumerate(c.description)}
-    ret = [{k: row[cn_idx[k]] for k in vrp_dict_fields} for row in c.fetchall()]
-    return ret
 
+    async def process_startup(self, scope, event):
+        await pool.open()
 
-def get_covering_vrps_for_prefix_at_time(c: psycopg.Cursor, prefix, timestamp: datetime) -> list:
-    c.execute("""
-        SELECT * FROM vrps
-        WHERE prefix >>= %s
-        AND visible @> %s
-    """, (prefix, timestamp))
-    return rows_to_vrp(c)
+    async def process_shutdown(self, scope, event):
+        await pool.close()
+
+
+# Build the /vrp response documents directly in Postgres. The jsonb expression covers
+# everything the Python formatting loop used to do (prefix compression, visible range
+# unpacking, timestamp formatting), so the response body arrives as ready-to-send JSON
+# text. An open visible range means the VRP is visible in the latest dump, so its upper
+# bound is reported as the latest dump time.
+VRP_JSONB_OBJECT = """jsonb_build_object(
+    'prefix', v.prefix::text,
+    'asn', v.asn,
+    'max_length', v.max_length,
+    'visible', jsonb_build_object(
+        'from', lower(v.visible),
+        'to', coalesce(upper(v.visible), (SELECT latest FROM dump_time_range))
+    ))"""
+
+
+async def get_covering_vrps_json_at_time(conn: psycopg.AsyncConnection, prefix, timestamp: datetime) -> bytes:
+    """Return all covering VRPs for the specified prefix that are visible at the
+    specified timestamp, as a serialized JSON list.
+    """
+    async with conn.cursor() as c:
+        await c.execute(f"""
+            SELECT coalesce(jsonb_agg({VRP_JSONB_OBJECT})::text, '[]')
+            FROM vrps v
+            WHERE v.prefix >>= %s
+            AND v.visible @> %s
+        """, (prefix, timestamp), prepare=True)
+        return (await c.fetchone())[0].encode()
+
+
+async def get_covering_vrps_json_at_latest(conn: psycopg.AsyncConnection, prefix) -> bytes:
+    """Return all covering VRPs for the specified prefix that are visible in the latest
+    available dump, as a serialized JSON list.
+
+    The latest dump time is read within the same query, so the default (no timestamp)
+    case needs only a single round trip and always uses the current value, even if the
+    process-local dump time range cache is stale.
+    """
+    async with conn.cursor() as c:
+        await c.execute(f"""
+            SELECT coalesce(jsonb_agg({VRP_JSONB_OBJECT})::text, '[]')
+            FROM vrps v, dump_time_range r
+            WHERE v.prefix >>= %s
+            AND v.visible @> r.latest
+        """, (prefix, ), prepare=True)
+        return (await c.fetchone())[0].encode()
 
 
-def get_covering_vrps_for_prefix_within_timerange(c: psycopg.Cursor,
+async def get_covering_vrps_json_within_timerange(conn: psycopg.AsyncConnection,
                                                   prefix,
-                                                  timerange: Range) -> list:
+                                                  timerange: Range) -> bytes:
     """Return all covering VRPs for the specified prefix whose visible range overlaps
-    with the specified timerange.
+    with the specified timerange, as a serialized JSON list.
     """
-    c.execute("""
-        SELECT * FROM vrps
-        WHERE prefix >>= %s
-        AND visible && %s
-        ORDER BY visible
-    """, (prefix, timerange))
-    return rows_to_vrp(c)
+    async with conn.cursor() as c:
+        await c.execute(f"""
+            SELECT coalesce(jsonb_agg({VRP_JSONB_OBJECT} ORDER BY v.visible)::text, '[]')
+            FROM vrps v
+            WHERE v.prefix >>= %s
+            AND v.visible && %s
+        """, (prefix, timerange), prepare=True)
+        return (await c.fetchone())[0].encode()
 
 
-def get_rpki_status(c: psycopg.Cursor, prefix, timestamp: datetime, asn: int) -> dict:
+async def get_rpki_status(conn: psycopg.AsyncConnection, prefix, timestamp: datetime, asn: int) -> dict:
     """Infer the RPKI status for the specified prefix/origin ASN combination at the
     specified timestamp.
 
@@ -66,16 +147,22 @@ def get_rpki_status(c: psycopg.Cursor, prefix, timestamp: datetime, asn: int) ->
 
     See: https://www.rfc-editor.org/rfc/rfc6811#section-2.1
     """
-    vrps = get_covering_vrps_for_prefix_at_time(c, prefix, timestamp)
-    if not vrps:
+    # Classify with a single aggregate query so only three values cross the wire
+    # instead of every covering VRP. AS0 VRPs never provide a matching origin.
+    async with conn.cursor() as c:
+        await c.execute("""
+            SELECT count(*),
+                   bool_or(asn = %s AND asn <> 0),
+                   bool_or(asn = %s AND asn <> 0 AND max_length >= %s)
+            FROM vrps
+            WHERE prefix >>= %s
+            AND visible @> %s
+        """, (asn, asn, prefix.prefixlen, prefix, timestamp), prepare=True)
+        covering, same_origin_asn_found, valid = await c.fetchone()
+    if covering == 0:
         return {'status': 'NotFound'}
-    same_origin_asn_found = False
-    for vrp in vrps:
-        if vrp['asn'] == 0 or vrp['asn'] != asn:
-            continue
-        same_origin_asn_found = True
-        if prefix.prefixlen <= vrp['max_length']:
-            return {'status': 'Valid'}
+    if valid:
+        return {'status': 'Valid'}
     if same_origin_asn_found:
         return {
             'status': 'Invalid',
@@ -94,41 +181,113 @@ def get_rpki_status(c: psycopg.Cursor, prefix, timestamp: datetime, asn: int) ->
     }
 
 
-def get_available_dump_time_range(c: psycopg.Cursor) -> Tuple[datetime, datetime] | Tuple[None, None]:
+async def get_available_dump_time_range(conn: psycopg.AsyncConnection) -> Tuple[datetime, datetime] | Tuple[None, None]:
     """Get the latest dump time as datetime from the database."""
-    c.execute('SELECT earliest, latest FROM dump_time_range')
-    res = c.fetchone()
+    async with conn.cursor() as c:
+        await c.execute('SELECT earliest, latest FROM dump_time_range', prepare=True)
+        res = await c.fetchone()
     if res is None:
         return None, None
     earliest, latest = res
     return earliest, latest
 
 
+# The available dump time range only changes when a new dump is ingested (on the order
+# of hours), but it is needed by every request, so cache it for a short time.
+_dump_range_cache = {'exp': 0.0, 'val': (None, None)}
+# The refresh awaits a query, so use an asyncio lock; a thread lock held across an
+# await could deadlock the event loop.
+_dump_range_lock = asyncio.Lock()
+
+
+async def get_cached_dump_time_range(conn: psycopg.AsyncConnection, ttl: int = 30) -> Tuple[datetime, datetime] | Tuple[None, None]:
+    """Like get_available_dump_time_range, but serve the result from a process-local
+    cache with the specified TTL (in seconds) to avoid a database round trip per
+    request.
+    """
+    if time.monotonic() < _dump_range_cache['exp']:
+        return _dump_range_cache['val']
+    async with _dump_range_lock:
+        # Another task may have refreshed the cache while we waited for the lock.
+        if time.monotonic() < _dump_range_cache['exp']:
+            return _dump_range_cache['val']
+        val = await get_available_dump_time_range(conn)
+        _dump_range_cache['val'] = val
+        _dump_range_cache['exp'] = time.monotonic() + ttl
+    return val
+
+
+# RPKI state only changes when a new dump is ingested, so identical requests within a
+# short window produce identical responses. Cache the fully formatted response bodies
+# for point-in-time queries, keyed by (prefix, timestamp[, asn]). A hit bypasses both
+# the database and the response formatting. TTLCache is not thread safe, so guard all
+# accesses with a lock.
+_response_cache = TTLCache(maxsize=10000, ttl=60)
+_response_cache_lock = threading.Lock()
+
+
+def get_cached_response(key):
+    with _response_cache_lock:
+        return _response_cache.get(key)
+
+
+def put_cached_response(key, value) -> None:
+    with _response_cache_lock:
+        _response_cache[key] = value
+
+
+class ORJSONHandler(falcon.media.BaseHandler):
+    """JSON media handler based on orjson, which serializes large lists of dicts
+    significantly faster than the stdlib encoder and formats datetime objects natively
+    (RFC 3339, like isoformat()).
+    """
+
+    def serialize(self, media, content_type: str) -> bytes:
+        return orjson.dumps(media)
+
+    def deserialize(self, stream, content_type: str, content_length: int):
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as e:
+            raise falcon.MediaMalformedError(falcon.MEDIA_JSON) from e
+
+
+@lru_cache(maxsize=4096)
+def parse_prefix(prefix: str) -> ipaddress.IPv4Network | ipaddress.IPv6Network:
+    """Parse the specified prefix, caching the result.
+
+    Production traffic queries the same small set of prefixes repeatedly (e.g., from
+    monitoring), so the cache avoids re-running the rather slow ip_network constructor.
+    """
+    return ipaddress.ip_network(prefix)
+
+
+INVALID_TIMESTAMP_MSG = 'Timestamp has to be in epoch or %Y-%m-%dT%H:%M:%S format.'
+
+
 def parse_timestamp(timestamp: str, param_name: str) -> datetime:
     """Parse a timestamp either in %Y-%m-%dT%H:%M:%S or unix epoch format and return the
     corresponding datetime.
     """
+    # fromisoformat is C-accelerated, in contrast to strptime, which parses its format
+    # string on every call.
     try:
-        return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+        parsed = datetime.fromisoformat(timestamp)
+        # Naive timestamps are assumed to be UTC; aware ones must be converted, not
+        # have their offset stripped.
+        if parsed.tzinfo is None:
+            return parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
     except ValueError:
         pass
     try:
         return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
     except ValueError:
-        raise falcon.HTTPInvalidParam('Timestamp has to be in epoch or %Y-%m-%dT%H:%M:%S format.', param_name)
+        raise falcon.HTTPInvalidParam(INVALID_TIMESTAMP_MSG, param_name)
 
 
 class VRPResource:
-    def __init__(self) -> None:
-        self.conn = psycopg.connect(
-            host=db_host,
-            dbname=db_dbname,
-            user=db_user,
-            password=db_password,
-            autocommit=True
-        )
-
-    def on_get(self, req: falcon.Request, resp: falcon.Response):
+    async def on_get(self, req: falcon.Request, resp: falcon.Response):
         """Return all covering VRPs for the requested prefix at the specified timestamp.
 
         If no timestamp is specified, return data for the latest available dump in the
@@ -138,7 +297,7 @@ class VRPResource:
             raise falcon.HTTPMissingParam('prefix')
 
         try:
-            parsed_prefix = ipaddress.ip_network(req.get_param('prefix', required=True).strip())
+            parsed_prefix = parse_prefix(req.get_param('prefix', required=True).strip())
         except ValueError as e:
             raise falcon.HTTPInvalidParam(str(e), 'prefix')
 
@@ -147,13 +306,19 @@ class VRPResource:
                  req.has_param('timestamp__lte'))):
             raise falcon.HTTPBadRequest(description='timestamp and timestamp__gte/lte parameters are exclusive.')
 
-        with self.conn.cursor() as c:
-            earliest, latest = get_available_dump_time_range(c)
+        async with pool.connection() as conn:
+            earliest, latest = await get_cached_dump_time_range(conn)
             if req.has_param('timestamp'):
                 timestamp = parse_timestamp(req.get_param('timestamp', required=True), 'timestamp')
                 if earliest is None or timestamp < earliest or timestamp > latest:
                     raise falcon.HTTPNotFound(description='Requested timestamp is outside of available data.')
-                vrps = get_covering_vrps_for_prefix_at_time(c, parsed_prefix, timestamp)
+                cache_key = ('vrp', parsed_prefix, timestamp)
+                cached = get_cached_response(cache_key)
+                if cached is not None:
+                    resp.data = cached
+                    resp.content_type = falcon.MEDIA_JSON
+                    return
+                payload = await get_covering_vrps_json_at_time(conn, parsed_prefix, timestamp)
             elif req.has_param('timestamp__gte') or req.has_param('timestamp__lte'):
                 timestamp_start = None
                 if req.has_param('timestamp__gte'):
@@ -167,39 +332,32 @@ class VRPResource:
                         or (timestamp_end and timestamp_end > latest)):
                     raise falcon.HTTPNotFound(description='Requested timerange is outside of available data.')
 
+                # Do not cache timerange queries; the key space is unbounded and the
+                # hit rate in practice is low.
+                cache_key = None
                 timerange = Range(timestamp_start, timestamp_end, bounds='[]')
-                vrps = get_covering_vrps_for_prefix_within_timerange(c, parsed_prefix, timerange)
+                payload = await get_covering_vrps_json_within_timerange(conn, parsed_prefix, timerange)
             else:
                 timestamp = latest
                 if timestamp is None:
                     raise falcon.HTTPInternalServerError(description='Failed to get latest dump time.')
-                vrps = get_covering_vrps_for_prefix_at_time(c, parsed_prefix, timestamp)
-            # Format for JSON serialization.
-            for vrp in vrps:
-                vrp['prefix'] = vrp['prefix'].compressed
-                visible_range = vrp['visible']
-                # If the VRP is visible in the latest dump, the range has no upper
-                # bound.
-                if visible_range.upper is None:
-                    visible_to = latest.isoformat()
-                else:
-                    visible_to = visible_range.upper.isoformat()
-                vrp['visible'] = {'from': vrp['visible'].lower.isoformat(),
-                                  'to': visible_to}
-            resp.media = vrps
+                cache_key = ('vrp', parsed_prefix, timestamp)
+                cached = get_cached_response(cache_key)
+                if cached is not None:
+                    resp.data = cached
+                    resp.content_type = falcon.MEDIA_JSON
+                    return
+                payload = await get_covering_vrps_json_at_latest(conn, parsed_prefix)
+            if cache_key is not None:
+                put_cached_response(cache_key, payload)
+            # The payload is ready-to-send JSON produced by Postgres; bypass the media
+            # handler.
+            resp.data = payload
+            resp.content_type = falcon.MEDIA_JSON
 
 
 class StatusResource:
-    def __init__(self) -> None:
-        self.conn = psycopg.connect(
-            host=db_host,
-            dbname=db_dbname,
-            user=db_user,
-            password=db_password,
-            autocommit=True
-        )
-
-    def on_get(self, req: falcon.Request, resp: falcon.Response):
+    async def on_get(self, req: falcon.Request, resp: falcon.Response):
         """Return the RPKI status for the specified prefix and originating ASN."""
         required_params = ['prefix', 'asn']
         for param in required_params:
@@ -207,14 +365,14 @@ class StatusResource:
                 raise falcon.HTTPMissingParam(param)
 
         try:
-            parsed_prefix = ipaddress.ip_network(req.get_param('prefix', required=True).strip())
+            parsed_prefix = parse_prefix(req.get_param('prefix', required=True).strip())
         except ValueError as e:
             raise falcon.HTTPInvalidParam(str(e), 'prefix')
 
         asn = req.get_param_as_int('asn', required=True)
 
-        with self.conn.cursor() as c:
-            earliest, latest = get_available_dump_time_range(c)
+        async with pool.connection() as conn:
+            earliest, latest = await get_cached_dump_time_range(conn)
             if req.has_param('timestamp'):
                 timestamp = parse_timestamp(req.get_param('timestamp', required=True), 'timestamp')
                 if earliest is None or timestamp < earliest or timestamp > latest:
@@ -224,91 +382,105 @@ class StatusResource:
                 if timestamp is None:
                     raise falcon.HTTPInternalServerError(description='Failed to get latest dump time.')
 
-            resp.media = get_rpki_status(c, parsed_prefix, timestamp, asn)
+            cache_key = ('status', parsed_prefix, timestamp, asn)
+            cached = get_cached_response(cache_key)
+            if cached is not None:
+                resp.media = cached
+                return
+            status = await get_rpki_status(conn, parsed_prefix, timestamp, asn)
+            put_cached_response(cache_key, status)
+            resp.media = status
 
 
 class MetadataResource:
-    def __init__(self) -> None:
-        self.conn = psycopg.connect(
-            host=db_host,
-            dbname=db_dbname,
-            user=db_user,
-            password=db_password,
-            autocommit=True
-        )
-        self.MAX_PAGE_SIZE = 10000
-
-    def on_get(self, req: falcon.Request, resp: falcon.Response):
+    MAX_PAGE_SIZE = 10000
+
+    async def on_get(self, req: falcon.Request, resp: falcon.Response):
         """Return a list of dump timestamps and associated metadata."""
-        # We construct the query dynamically depending on which parameters the user specified.
-        query_parts = [sql.SQL('SELECT dump_time, deleted_vrps, unchanged_vrps, new_vrps FROM metadata ')]
-        # Parameters for the SQL query. Length needs to match the number of
-        # sql.Placeholder() instances we added in query_parts.
+        # We construct the query dynamically depending on which parameters the user
+        # specified. All fragments are static strings with %s placeholders (no
+        # user-supplied identifiers), so there is no need for psycopg.sql composition,
+        # and the few distinct query texts are prepared server-side.
+        where_clauses = list()
+        # Parameters for the SQL query. Length needs to match the number of %s
+        # placeholders in the final query.
         query_parameters = list()
         # Gather parameters for the URI pointing to the next page.
-        uri_parameters = list()
-        connector = sql.SQL('WHERE ')
+        next_uri_params = dict()
         if req.has_param('timestamp__gte'):
             timestamp_gte_param = req.get_param('timestamp__gte', required=True)
             timestamp_start = parse_timestamp(timestamp_gte_param, 'timestamp__gte')
-            query_parts.append(connector)
-            query_parts.append(sql.SQL('dump_time >= {} ').format(sql.Placeholder()))
+            where_clauses.append('dump_time >= %s')
             query_parameters.append(timestamp_start)
-            uri_parameters.append(f'timestamp__gte={timestamp_gte_param}')
-            connector = sql.SQL('AND ')
+            next_uri_params['timestamp__gte'] = timestamp_gte_param
         if req.has_param('timestamp__lte'):
             timestamp_lte_param = req.get_param('timestamp__lte', required=True)
             timestamp_end = parse_timestamp(req.get_param('timestamp__lte', required=True), 'timestamp__lte')
-            query_parts.append(connector)
-            query_parts.append(sql.SQL('dump_time <= {} ').format(sql.Placeholder()))
+            where_clauses.append('dump_time <= %s')
             query_parameters.append(timestamp_end)
-            uri_parameters.append(f'timestamp__lte={timestamp_lte_param}')
-
+            next_uri_params['timestamp__lte'] = timestamp_lte_param
+        # Keyset pagination: "after" is the dump_time of the last entry of the previous
+        # page (exclusive), so Postgres seeks directly to the next page instead of
+        # scanning and discarding OFFSET rows.
+        if req.has_param('after'):
+            after = parse_timestamp(req.get_param('after', required=True), 'after')
+            where_clauses.append('dump_time > %s')
+            query_parameters.append(after)
+
+        query = 'SELECT dump_time, deleted_vrps, unchanged_vrps, new_vrps FROM metadata'
+        if where_clauses:
+            query += ' WHERE ' + ' AND '.join(where_clauses)
         page_size = self.MAX_PAGE_SIZE
         if req.has_param('page_size'):
             page_size = req.get_param_as_int('page_size', required=True, min_value=1, max_value=self.MAX_PAGE_SIZE)
-        page = 1
+        query += ' ORDER BY dump_time LIMIT %s'
+        query_parameters.append(page_size)
+        # Deprecated offset-based pagination, kept for backwards compatibility. New
+        # clients should follow the returned next URI, which uses keyset pagination.
         if req.has_param('page'):
             page = req.get_param_as_int('page', required=True, min_value=1)
-        query_parts.append(sql.SQL('ORDER BY dump_time LIMIT {} OFFSET {}')
-                           .format(sql.Placeholder(), sql.Placeholder()))
-        query_parameters.append(page_size)
-        query_parameters.append((page - 1) * page_size)
-        uri_parameters.append(f'page_size={page_size}')
-        uri_parameters.append(f'page={page + 1}')
+            query += ' OFFSET %s'
+            query_parameters.append((page - 1) * page_size)
+        next_uri_params['page_size'] = page_size
 
-        with self.conn.cursor() as c:
-            c.execute(sql.Composed(query_parts), query_parameters)
+        async with pool.connection() as conn, conn.cursor() as c:
+            await c.execute(query, query_parameters, prepare=True)
             formatted_results = [
                 {
-                    'timestamp': e[0].isoformat(),
+                    'timestamp': e[0],
                     'deleted_vrps': e[1],
                     'unchanged_vrps': e[2],
                     'new_vrps': e[3]
-                } for e in c.fetchall()
+                } async for e in c
             ]
             # Only return a next URI if there are results left.
             # This creates one unnecessary next_uri if the last page fits the
             # remaining results exactly, but better than nothing.
             next_uri = str()
             if len(formatted_results) == page_size:
-                next_uri = falcon.uri.encode(f'{req.uri}?' + '&'.join(uri_parameters))
+                # Pass the timestamp in epoch format so it requires no URL encoding.
+                next_uri_params['after'] = int(formatted_results[-1]['timestamp'].timestamp())
+                next_uri = f'{req.prefix}{req.path}?{urlencode(next_uri_params)}'
             resp.media = {
                 'next': next_uri,
                 'results': formatted_results
             }
 
 
-def default_sink(req: falcon.Request, resp: falcon.Response, **kwargs):
+async def default_sink(req: falcon.Request, resp: falcon.Response, **kwargs):
     """Redirect all unknown paths to the documentation."""
     raise falcon.HTTPMovedPermanently(f'{custom_location}/docs')
 
 
-application = falcon.App(
+application = falcon.asgi.App(
     cors_enable=True,
-    sink_before_static_route=False
+    sink_before_static_route=False,
+    middleware=[ConnectionPoolMiddleware()]
 )
 application.req_options.strip_url_path_trailing_slash = True
+_orjson_handler = ORJSONHandler()
+application.req_options.media_handlers[falcon.MEDIA_JSON] = _orjson_handler
+application.resp_options.media_handlers[falcon.MEDIA_JSON] = _orjson_handler
 application.add_route(f'{custom_location}/vrp', VRPResource())
 application.add_route(f'{custom_location}/status', StatusResource())
 application.add_route(f'{custom_location}/metadata', MetadataResource())
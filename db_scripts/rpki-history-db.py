@@ -3,28 +3,50 @@ import base64
 import csv
 import hashlib
 import io
-import ipaddress
 import logging
 import os
-import subprocess as sp
+import re
 import sys
+import tarfile
 from collections import namedtuple
 from datetime import datetime, timedelta, timezone
+from typing import Iterable
 
-import pandas as pd
 import psycopg
 import psycopg.sql
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import requests
-from bs4 import BeautifulSoup
 from psycopg.types.range import Range
 
 vrp_tuple_fields = ['prefix', 'asn', 'max_length']
 VRP = namedtuple('VRP', vrp_tuple_fields)
 
 RPKIVIEWS_HOST = 'https://dango.attn.jp'
+# Precompiled counterpart of the RPKIViews file_fmt; matching groups and calling
+# the datetime constructor directly is much faster than strptime, which re-parses
+# its format string on every call while scanning a folder listing.
+RPKIVIEWS_FNAME_RE = re.compile(r'rpki-(\d{4})(\d{2})(\d{2})T(\d{2})(\d{2})(\d{2})Z\.tgz')
 RPKIFLUTTER_VP = 'routinator-3.rpki.ripe.net'
 
 
+class HashingReader:
+    """File-like wrapper that computes the SHA256 digest of all data read through
+    it, so a streamed download can be verified after it was consumed.
+    """
+
+    def __init__(self, f) -> None:
+        self.f = f
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        # urllib3 responses do not accept a negative size for "read everything".
+        data = self.f.read() if size < 0 else self.f.read(size)
+        self.sha256.update(data)
+        return data
+
+
 class RPKIHistory:
     def __init__(self) -> None:
         self.db_host = os.environ['POSTGRES_HOST']
@@ -32,17 +54,22 @@ class RPKIHistory:
         self.db_user = os.environ['POSTGRES_USER']
         with open('/run/secrets/postgres-pw', 'r') as f:
             self.db_password = f.read()
+        # Reuse one HTTP connection (TCP + TLS) across the listing, checksum, and
+        # download requests.
+        self.session = requests.Session()
         self.url_fmt = str()
         self.file_fmt = str()
         # The URL of the newest file.
         self.new_file_url = str()
-        # The content of the newest file (after download).
-        self.new_file_content = bytes()
         # The datetime of the newest file.
         self.new_ts = None
         # The datetime of the latest available data in the database.
         self.latest_ts = None
-        # Map of VRP to (ID [database], visible time range [as psycopg Range]) tuple.
+        # The Last-Modified header of the folder listing, as stored by the previous
+        # run and as returned by the current one.
+        self.listing_last_modified = None
+        self.new_listing_last_modified = None
+        # Map of VRP to (ID [database], lower bound of visible time range) tuple.
         self.latest_vrps = dict()
 
     def __enter__(self):
@@ -75,6 +102,29 @@ class RPKIHistory:
                 max_length integer,
                 visible tstzrange)
             """)
+            # The API filters with prefix >>= %s AND visible @>/&& %s, so a composite
+            # GiST index (inet_ops enables the network containment operators) lets a
+            # single index scan answer both predicates.
+            c.execute("""
+            CREATE INDEX IF NOT EXISTS vrps_prefix_visible_gist
+            ON vrps
+            USING gist (prefix inet_ops, visible)
+            """)
+            # get_latest_vrps filters on visible alone (visible @> latest_ts), which
+            # the composite index cannot answer efficiently since prefix is its
+            # leading column.
+            c.execute("""
+            CREATE INDEX IF NOT EXISTS vrps_visible_gist
+            ON vrps
+            USING gist (visible)
+            """)
+            # The SQL-side dump diff matches rows on the VRP identity columns; a
+            # btree on them keeps the anti-joins from degrading to sequential
+            # scans.
+            c.execute("""
+            CREATE INDEX IF NOT EXISTS vrps_identity_idx
+            ON vrps (prefix, asn, max_length)
+            """)
             c.execute("""
             CREATE TABLE IF NOT EXISTS metadata (
                 id serial PRIMARY KEY,
@@ -84,11 +134,18 @@ class RPKIHistory:
                 unchanged_vrps integer,
                 new_vrps integer)
             """)
+            # The API's /metadata endpoint filters and keyset-paginates on
+            # dump_time.
+            c.execute("""
+            CREATE INDEX IF NOT EXISTS metadata_dump_time_idx
+            ON metadata (dump_time DESC)
+            """)
             c.execute("""
             CREATE TABLE IF NOT EXISTS dump_time_range (
                 id integer PRIMARY KEY,
                 earliest timestamp (0) with time zone,
-                latest timestamp (0) with time zone)
+                latest timestamp (0) with time zone,
+                listing_last_modified text)
             """)
             c.execute(psycopg.sql.SQL("""
             CREATE ROLE {}
@@ -104,54 +161,89 @@ class RPKIHistory:
 
     def insert_or_update_latest_dump_ts(self, c: psycopg.Cursor, ts: datetime) -> None:
         """Update the latest dump time or initialize the table row if it not exists."""
-        # This table only has one row.
+        # This table only has one row. coalesce keeps the stored listing header
+        # when the current run did not fetch the listing (flutter mode or a
+        # specific-timestamp fetch).
         if self.latest_ts:
             c.execute("""
                 UPDATE dump_time_range
-                SET latest = %s
+                SET latest = %s,
+                    listing_last_modified = coalesce(%s, listing_last_modified)
                 WHERE id = 1
-            """, (ts, ))
+            """, (ts, self.new_listing_last_modified))
         else:
             # No entry yet, initialize with one range.
             c.execute("""
-                INSERT INTO dump_time_range
-                VALUES (1, %s, %s)
-            """, (ts, ts))
+                INSERT INTO dump_time_range (id, earliest, latest, listing_last_modified)
+                VALUES (1, %s, %s, %s)
+            """, (ts, ts, self.new_listing_last_modified))
 
     def get_latest_dump_ts(self, c: psycopg.Cursor) -> None:
         """Get the available dump time ranges from the database."""
-        c.execute('SELECT latest FROM dump_time_range')
+        c.execute('SELECT latest, listing_last_modified FROM dump_time_range')
         res = c.fetchone()
         if res is not None:
-            self.latest_ts = res[0]
+            self.latest_ts, self.listing_last_modified = res
         logging.info(f'Latest dump timestamp: {self.latest_ts}')
 
     def rows_to_vrp(self, c: psycopg.Cursor) -> dict:
-        """Transform the result set of the cursor to a map of VRP -> (id, visible)."""
+        """Transform the result set of the cursor to a map of VRP -> (id, lo), where
+        lo is the lower bound of the visible range.
+        """
         if c.description is None:
             return dict()
-        # To be robust against changes in the database schema and/or reordering of
-        # columns, use a index map.
-        cn_idx = {column.name: idx for idx, column in enumerate(c.description)}
+        # The column order is fixed by the SELECT in get_latest_vrps, so unpack the
+        # tuples positionally instead of going through a name->index map per field.
         return {
-            VRP(
-                *[e[cn_idx[column_name]]
-                  for column_name in vrp_tuple_fields]
-            ):
-            (e[cn_idx['id']], e[cn_idx['visible']])
-            for e in c.fetchall()
+            VRP(prefix, asn, max_length): (vrp_id, lo)
+            for vrp_id, prefix, asn, max_length, lo in c
         }
 
-    def get_latest_vrps(self, c: psycopg.Cursor) -> None:
+    def copy_vrps(self, c: psycopg.Cursor, rows: Iterable) -> None:
+        """Bulk-insert (prefix, asn, max_length, visible) rows using COPY, which skips
+        the per-statement overhead of executemany for large dumps.
+        """
+        with c.copy('COPY vrps (prefix, asn, max_length, visible) FROM STDIN') as cp:
+            for row in rows:
+                cp.write_row(row)
+
+    def close_vrps(self, c: psycopg.Cursor, rows: Iterable) -> None:
+        """Set the visible range for the specified (visible, id) rows by staging them
+        in a temporary table and issuing a single UPDATE, instead of one round trip
+        per row.
+        """
+        c.execute("""
+            CREATE TEMP TABLE vrps_close (
+                id bigint,
+                visible tstzrange)
+            ON COMMIT DROP
+        """)
+        with c.copy('COPY vrps_close (visible, id) FROM STDIN') as cp:
+            for row in rows:
+                cp.write_row(row)
+        c.execute("""
+            UPDATE vrps
+            SET visible = t.visible
+            FROM vrps_close t
+            WHERE vrps.id = t.id
+        """)
+
+    def get_latest_vrps(self) -> None:
         """Get the set of latest available VRPs from the database (if any)."""
         if self.latest_ts is None:
             return
 
-        c.execute("""
-            SELECT * FROM vrps
-            WHERE visible @> %s
-        """, (self.latest_ts, ))
-        self.latest_vrps = self.rows_to_vrp(c)
+        # A server-side (named) cursor streams the snapshot in batches, so the
+        # full result set is never materialized on the client before the map is
+        # built. Only the lower bound of the visible range is needed to close out
+        # withdrawn VRPs, so do not transfer the full range per row.
+        with self.conn.cursor(name='latest_vrps') as c:
+            c.itersize = 50000
+            c.execute("""
+                SELECT id, prefix::text, asn, max_length, lower(visible) AS lo FROM vrps
+                WHERE visible @> %s
+            """, (self.latest_ts, ))
+            self.latest_vrps = self.rows_to_vrp(c)
         logging.info(f'Loaded {len(self.latest_vrps)} VRPs from database')
 
     def update_db(self, timestamp: datetime = None):
@@ -159,6 +251,10 @@ class RPKIHistory:
         if available and no timestamp is specified.
         """
         with self.conn.cursor() as c:
+            # Skip the fsync wait at commit. With a single writer this at worst
+            # loses the current dump on a crash, and the next run simply re-ingests
+            # it from the still-available file.
+            c.execute('SET LOCAL synchronous_commit = off')
             self.get_latest_dump_ts(c)
 
             # Fetch new VRPs.
@@ -168,26 +264,36 @@ class RPKIHistory:
                 if not self.fetch_and_read_new_file():
                     logging.info('No new data available.')
                     return
-            # Get latest VRPs from database.
-            self.get_latest_vrps(c)
             self.process_vrps(c)
             self.conn.commit()
 
     def fetch_and_read_file(self) -> None:
-        """Download the file specified by new_file_url and parse its contents."""
+        """Download the file specified by new_file_url and parse its contents while
+        streaming, so the archive is never buffered in memory as a whole. The
+        integrity of the stream is verified after it was consumed; parsed data is
+        discarded and the download retried if verification fails.
+        """
         for attempt in range(1, 4):
             logging.info(f'Attempt {attempt}')
             logging.info(f'Fetching file: {self.new_file_url}')
-            r = requests.get(self.new_file_url)
+            r = self.session.get(self.new_file_url, stream=True)
             try:
                 r.raise_for_status()
             except requests.HTTPError as e:
                 logging.error(f'Failed to fetch file: {e}')
                 continue
-            self.new_file_content = r.content
-            if self.verify_file_integrity():
+            f = HashingReader(r.raw)
+            try:
+                self.read_file(f)
+                # Consume the remainder of the stream so the digest covers the
+                # entire file.
+                while f.read(io.DEFAULT_BUFFER_SIZE):
+                    pass
+            except (tarfile.TarError, OSError) as e:
+                logging.error(f'Failed to read file: {e}')
+                continue
+            if self.verify_file_integrity(f.sha256.digest()):
                 continue
-            self.read_file()
             return
         logging.info('Too many failed attempts. Aborting.')
         raise RuntimeError('Too many failed attempts.')
@@ -213,14 +319,14 @@ class RPKIHistory:
         )
         self.fetch_and_read_file()
 
-    def verify_file_integrity(self) -> bool:
+    def verify_file_integrity(self, digest: bytes) -> bool:
         # Default is no verification, i.e., never raise an error.
         return False
 
     def get_new_file_url(self) -> None:
         raise NotImplementedError()
 
-    def read_file(self) -> None:
+    def read_file(self, f) -> None:
         raise NotImplementedError()
 
     def process_vrps(self, c: psycopg.Cursor) -> None:
@@ -236,13 +342,14 @@ class RPKIViews(RPKIHistory):
         self.file_fmt = 'rpki-%Y%m%dT%H%M%SZ.tgz'
 
     def get_datetime_from_filename(self, fname: str) -> datetime:
-        return datetime.strptime(fname, self.file_fmt).replace(tzinfo=timezone.utc)
+        year, month, day, hour, minute, second = map(int, RPKIVIEWS_FNAME_RE.fullmatch(fname).groups())
+        return datetime(year, month, day, hour, minute, second, tzinfo=timezone.utc)
 
-    def verify_file_integrity(self) -> bool:
+    def verify_file_integrity(self, digest: bytes) -> bool:
         logging.info('Verifying file integrity.')
         fname = os.path.basename(self.new_file_url)
         hash_file_url = os.path.join(os.path.dirname(self.new_file_url), 'SHA256')
-        r = requests.get(hash_file_url)
+        r = self.session.get(hash_file_url)
         try:
             r.raise_for_status()
         except requests.HTTPError as e:
@@ -266,7 +373,7 @@ class RPKIViews(RPKIHistory):
                           'file.')
             return True
         logging.info(f'Expected checksum: {expected_checksum}')
-        actual_checksum = base64.b64encode(hashlib.sha256(self.new_file_content).digest()).decode()
+        actual_checksum = base64.b64encode(digest).decode()
         logging.info(f'  Actual checksum: {actual_checksum}')
         if actual_checksum == expected_checksum:
             logging.info('Verification OK')
@@ -278,25 +385,33 @@ class RPKIViews(RPKIHistory):
         """Get the URL of the newest available file."""
         curr_ts = datetime.now(tz=timezone.utc)
         folder_url = curr_ts.strftime(self.url_fmt)
-        r = requests.get(folder_url)
+        headers = dict()
+        if self.listing_last_modified:
+            # Echo the listing's own Last-Modified from the previous run; if the
+            # folder is unchanged the server replies 304 without the listing body.
+            headers['If-Modified-Since'] = self.listing_last_modified
+        r = self.session.get(folder_url, headers=headers)
         # If we are just after midnight UTC, we should look at the previous day.
         if r.status_code == 404:
             curr_ts -= timedelta(hours=24)
             folder_url = curr_ts.strftime(self.url_fmt)
-            r = requests.get(folder_url)
+            r = self.session.get(folder_url, headers=headers)
             try:
                 r.raise_for_status()
             except Exception as e:
                 logging.error(f'Failed to get latest file: {e}')
                 return
+        if r.status_code == 304:
+            logging.info('Folder listing unmodified since last run.')
+            return
+        # Stored with the next successful ingestion to make the conditional
+        # request above work.
+        self.new_listing_last_modified = r.headers.get('Last-Modified')
 
-        soup = BeautifulSoup(r.text, features='html.parser')
         new_file = str()
-        for link in soup.find_all('a'):
-            href = link['href']
-            if not href.startswith('rpki-'):
-                continue
-
+        # The filename format is predictable, so a single regex pass over the
+        # listing replaces building an HTML DOM.
+        for href in re.findall(r'href="(rpki-\d{8}T\d{6}Z\.tgz)"', r.text):
             file_ts = self.get_datetime_from_filename(href)
             if self.new_ts is None or file_ts > self.new_ts:
                 self.new_ts = file_ts
@@ -308,67 +423,117 @@ class RPKIViews(RPKIHistory):
 
         self.new_file_url = os.path.join(folder_url, new_file)
 
-    def read_file(self) -> None:
-        """Read the contents of the downloaded file and parse VRP entries."""
+    def read_file(self, f) -> None:
+        """Read the downloaded file from the specified stream and parse VRP
+        entries.
+        """
         logging.info('Reading file')
         base = os.path.basename(self.new_file_url).removesuffix('.tgz')
         member = f'{base}/output/rpki-client.csv'
-        # Scripts runs in Alpine-based Docker container.
-        ps = sp.run(['tar', 'x', '-z', '-O', '-f', '-', member],
-                    input=self.new_file_content,
-                    stdout=sp.PIPE,
-                    check=True)
-
-        for l in csv.DictReader(ps.stdout.decode().splitlines()):
-            asn = int(l['ASN'].removeprefix('AS'))
-            prefix = ipaddress.ip_network(l['IP Prefix'])
-            max_length = int(l['Max Length'])
-            self.new_vrps.add(VRP(prefix, asn, max_length))
+        # Collect the rows in a list and build the set in one pass at the end,
+        # which avoids the incremental rehashing of a growing set and keeps a
+        # retried download from mixing with stale data.
+        vrps = list()
+        member_found = False
+        # Streaming mode (r| instead of r:) decompresses the archive as it is
+        # downloaded, without requiring a seekable file.
+        with tarfile.open(fileobj=f, mode='r|gz') as tf:
+            for info in tf:
+                if info.name != member:
+                    continue
+                member_found = True
+                # tarfile's stream-mode file objects do not implement seekable(),
+                # which TextIOWrapper probes, so decode the lines directly.
+                reader = csv.reader(line.decode('utf-8') for line in tf.extractfile(info))
+                # Resolve the column positions from the header once and index the
+                # rows directly, instead of letting DictReader build a dict per
+                # row.
+                header = next(reader, None)
+                if header is None:
+                    raise RuntimeError(f'No VRPs parsed from member: {member}')
+                idx = {name: i for i, name in enumerate(header)}
+                asn_i, pfx_i, ml_i = idx['ASN'], idx['IP Prefix'], idx['Max Length']
+                for row in reader:
+                    asn = int(row[asn_i].removeprefix('AS'))
+                    # Keep the prefix as text; the sources emit canonical CIDR
+                    # notation and PostgreSQL parses it natively when the rows are
+                    # copied into the cidr column, which is much faster than going
+                    # through Python's ipaddress.
+                    prefix = row[pfx_i]
+                    max_length = int(row[ml_i])
+                    vrps.append(VRP(prefix, asn, max_length))
+        # An archive without the expected member (or an empty VRP list) must abort
+        # the run: diffing an empty set against the database would close the
+        # visible range of every live VRP.
+        if not member_found:
+            raise RuntimeError(f'Expected member not found in archive: {member}')
+        if not vrps:
+            raise RuntimeError(f'No VRPs parsed from member: {member}')
+        self.new_vrps = set(vrps)
         logging.info(f'Read {len(self.new_vrps)} unique VRPs from file')
 
     def process_vrps(self, c: psycopg.Cursor) -> None:
-        # Compute differences.
-        deleted_vrps = set(self.latest_vrps.keys()) - self.new_vrps
-        unchanged_vrps = self.new_vrps.intersection(self.latest_vrps.keys())
-        insert_vrps = self.new_vrps - self.latest_vrps.keys()
+        # Stage the parsed VRPs and let the database compute the set differences
+        # against the current snapshot, instead of pulling the entire snapshot into
+        # Python.
+        c.execute("""
+            CREATE TEMP TABLE vrps_new (
+                prefix cidr,
+                asn bigint,
+                max_length integer)
+            ON COMMIT DROP
+        """)
+        with c.copy('COPY vrps_new (prefix, asn, max_length) FROM STDIN') as cp:
+            for vrp in self.new_vrps:
+                cp.write_row(vrp)
+
+        # Set upper bound of visible range for deleted VRPs.
+        num_deleted_vrps = 0
+        if self.latest_ts is not None:
+            c.execute("""
+                UPDATE vrps v
+                SET visible = tstzrange(lower(v.visible), %s, '[]')
+                WHERE v.visible @> %s
+                AND NOT EXISTS (
+                    SELECT 1 FROM vrps_new n
+                    WHERE n.prefix = v.prefix
+                    AND n.asn = v.asn
+                    AND n.max_length = v.max_length)
+            """, (self.latest_ts, self.latest_ts))
+            num_deleted_vrps = c.rowcount
+        logging.info(f'Set upper bound of visible range for {num_deleted_vrps} VRPs')
+
+        # Insert new VRPs. With an empty database (latest_ts is None) the NOT EXISTS
+        # subquery never matches, so all staged VRPs are inserted.
+        c.execute("""
+            INSERT INTO vrps (prefix, asn, max_length, visible)
+            SELECT n.prefix, n.asn, n.max_length, tstzrange(%s, NULL, '[)')
+            FROM vrps_new n
+            WHERE NOT EXISTS (
+                SELECT 1 FROM vrps v
+                WHERE v.visible @> %s
+                AND v.prefix = n.prefix
+                AND v.asn = n.asn
+                AND v.max_length = n.max_length)
+        """, (self.new_ts, self.latest_ts))
+        num_new_vrps = c.rowcount
+        num_unchanged_vrps = len(self.new_vrps) - num_new_vrps
+        logging.info(f'Inserted {num_new_vrps} new VRPs')
 
         # Insert metadata for this dump.
         c.execute("""
             INSERT INTO metadata (dump_time, deleted_vrps, unchanged_vrps, new_vrps)
             VALUES (%s, %s, %s, %s)
-            """, (self.new_ts, len(deleted_vrps), len(unchanged_vrps), len(insert_vrps)))
+            """, (self.new_ts, num_deleted_vrps, num_unchanged_vrps, num_new_vrps))
         self.insert_or_update_latest_dump_ts(c, self.new_ts)
 
-        # Set upper bound of visible range for deleted VRPs.
-        delete_data = list()
-        for vrp in deleted_vrps:
-            vrp_id, visible_range = self.latest_vrps[vrp]
-            delete_data.append((Range(visible_range.lower, self.latest_ts, bounds='[]'), vrp_id))
-        logging.info(f'Setting upper bound of visible range for {len(delete_data)} VRPs')
-        c.executemany("""
-            UPDATE vrps
-            SET visible = %s
-            WHERE id = %s
-        """, delete_data)
-
-        # Insert new VRPs.
-        insert_data = [
-            (vrp.prefix, vrp.asn, vrp.max_length, Range(lower=self.new_ts, bounds='[)'))
-            for vrp in insert_vrps
-        ]
-        logging.info(f'Inserting {len(insert_data)} new VRPs')
-        c.executemany("""
-            INSERT INTO vrps (prefix, asn, max_length, visible)
-            VALUES (%s, %s, %s, %s)
-        """, insert_data)
-
 
 class RPKIFlutter(RPKIHistory):
     def __init__(self) -> None:
         super().__init__()
         self.url_fmt = 'https://rd-www-1.ripe.net/rpki_flutter/daily/'
         self.file_fmt = 'rpki-flutter.%Y-%m-%d.parquet'
-        self.df = pd.DataFrame()
+        self.table = pa.table(dict())
 
     def get_new_file_url(self) -> None:
         """Get the URL of the newest available file."""
@@ -378,36 +543,45 @@ class RPKIFlutter(RPKIHistory):
         self.new_ts = curr_ts - timedelta(days=1)
         self.new_file_url = os.path.join(self.url_fmt, self.new_ts.strftime(self.file_fmt))
 
-        r = requests.head(self.new_file_url)
+        r = self.session.head(self.new_file_url)
         try:
             r.raise_for_status()
         except Exception as e:
             logging.error(f'Failed to get latest file ({self.new_file_url}): {e}')
             return
 
-    def read_file(self) -> None:
-        """Read the contents of the downloaded file and parse VRP entries."""
+    def read_file(self, f) -> None:
+        """Read the downloaded file from the specified stream and parse VRP
+        entries.
+        """
         logging.info('Reading file')
-        self.df = pd.read_parquet(io.BytesIO(self.new_file_content),
-                                  columns=['type', 'vp', 'capture_ts', 'asn', 'pfx', 'maxlen'])
-        self.df = self.df[self.df['vp'] == RPKIFLUTTER_VP]
-        self.df['capture_ts'] = pd.to_datetime(self.df['capture_ts'], utc=True, unit='s')
-        self.df['asn'] = self.df['asn'].apply(lambda x: int(x.removeprefix('AS')))
-        self.df['pfx'] = self.df['pfx'].apply(lambda x: ipaddress.ip_network(x))
-        msg_counts = self.df['type'].value_counts()
-        state_msg = 0
-        announce_msg = 0
-        withdraw_msg = 0
-        if 'S' in msg_counts:
-            state_msg = msg_counts.loc['S']
-        if 'A' in msg_counts:
-            announce_msg = msg_counts.loc['A']
-        if 'W' in msg_counts:
-            withdraw_msg = msg_counts.loc['W']
-        logging.info(f'Read {len(self.df)} messages from file. {state_msg} state, {announce_msg} announce, '
+        # Parquet requires a seekable file, so buffer the (single-day) file. Stay on
+        # Arrow arrays instead of converting to pandas; the compute kernels below
+        # operate on the contiguous column buffers directly.
+        table = pq.read_table(io.BytesIO(f.read()),
+                              columns=['type', 'vp', 'capture_ts', 'asn', 'pfx', 'maxlen'])
+        table = table.filter(pc.equal(table['vp'], RPKIFLUTTER_VP))
+        table = table.set_column(
+            table.schema.get_field_index('capture_ts'),
+            'capture_ts',
+            pc.cast(table['capture_ts'], pa.timestamp('s', tz='UTC')))
+        table = table.set_column(
+            table.schema.get_field_index('asn'),
+            'asn',
+            pc.cast(pc.utf8_slice_codeunits(table['asn'], 2), pa.int64()))
+        # The prefix stays as text; see RPKIViews.read_file.
+        self.table = table
+        msg_counts = {e['values']: e['counts'] for e in pc.value_counts(table['type']).to_pylist()}
+        state_msg = msg_counts.get('S', 0)
+        announce_msg = msg_counts.get('A', 0)
+        withdraw_msg = msg_counts.get('W', 0)
+        logging.info(f'Read {table.num_rows} messages from file. {state_msg} state, {announce_msg} announce, '
                      f'{withdraw_msg}, withdraw.')
 
     def process_vrps(self, c: psycopg.Cursor) -> None:
+        # The message replay needs the current snapshot with ids and ranges in
+        # Python; RPKIViews diffs entirely in the database instead.
+        self.get_latest_vrps()
         # List of VRP rows that need to be updated, i.e., where in the previous dump and
         # got withdrawn.
         update_rows = list()
@@ -422,9 +596,16 @@ class RPKIFlutter(RPKIHistory):
         num_deleted_vrps = 0
         num_unchanged_vrps = 0
         num_new_vrps = 0
-        for row in self.df.itertuples():
-            vrp = VRP(row.pfx, row.asn, row.maxlen)
-            match row.type:
+        # The replay has to stay sequential: the meaning of a message depends on
+        # announce/withdraw pairs seen earlier in the same dump, which a vectorized
+        # groupby/merge would not preserve. to_pylist converts each column once,
+        # yielding plain Python values that psycopg adapts without surprises.
+        for row in zip(self.table['type'].to_pylist(), self.table['capture_ts'].to_pylist(),
+                       self.table['asn'].to_pylist(), self.table['pfx'].to_pylist(),
+                       self.table['maxlen'].to_pylist()):
+            msg_type, capture_ts, asn, pfx, maxlen = row
+            vrp = VRP(pfx, asn, maxlen)
+            match msg_type:
                 # Start state should be the same as the latest dump, but sometimes it
                 # includes additional messages.
                 case 'S':
@@ -433,7 +614,7 @@ class RPKIFlutter(RPKIHistory):
                         if self.latest_vrps:
                             logging.warning(f'Adding VRP from start state even though it was not in the latest dump. '
                                             f'{row}')
-                        insert_vrps[vrp] = Range(lower=row.capture_ts, bounds='[)')
+                        insert_vrps[vrp] = Range(lower=capture_ts, bounds='[)')
                         num_new_vrps += 1
                     else:
                         num_unchanged_vrps += 1
@@ -442,28 +623,28 @@ class RPKIFlutter(RPKIHistory):
                         logging.warning(f'Ignoring duplicate announce: {row}')
                         continue
                     num_new_vrps += 1
-                    insert_vrps[vrp] = Range(lower=row.capture_ts, bounds='[)')
+                    insert_vrps[vrp] = Range(lower=capture_ts, bounds='[)')
                 case 'W':
                     if vrp not in self.latest_vrps and vrp not in insert_vrps:
                         logging.warning(f'Withdraw of unknown VRP: {row}')
                         continue
                     num_deleted_vrps += 1
                     if vrp in self.latest_vrps:
-                        vrp_id, visible_range = self.latest_vrps.pop(vrp)
-                        update_rows.append((Range(visible_range.lower, row.capture_ts, bounds='[]'), vrp_id))
+                        vrp_id, lo = self.latest_vrps.pop(vrp)
+                        update_rows.append((Range(lo, capture_ts, bounds='[]'), vrp_id))
                     else:
                         visible_range = insert_vrps.pop(vrp)
                         insert_rows.append((
                             vrp.prefix,
                             vrp.asn,
                             vrp.max_length,
-                            Range(visible_range.lower, row.capture_ts, bounds='[]')
+                            Range(visible_range.lower, capture_ts, bounds='[]')
                         ))
                 case _:
                     logging.error(f'Unknown message type: {row}')
 
         # Insert metadata for this dump.
-        dump_time = self.df['capture_ts'].max()
+        dump_time = pc.max(self.table['capture_ts']).as_py()
         c.execute("""
             INSERT INTO metadata (dump_time, deleted_vrps, unchanged_vrps, new_vrps)
             VALUES (%s, %s, %s, %s)
@@ -472,29 +653,19 @@ class RPKIFlutter(RPKIHistory):
 
         # Set upper bound of visible range for deleted VRPs.
         logging.info(f'Setting upper bound of visible range for {len(update_rows)} VRPs')
-        c.executemany("""
-            UPDATE vrps
-            SET visible = %s
-            WHERE id = %s
-        """, update_rows)
+        self.close_vrps(c, update_rows)
 
         # Insert new VRPs with visible range entirely within dump.
         logging.info(f'Inserting {len(insert_rows)} fluttered VRPs')
-        c.executemany("""
-            INSERT INTO vrps (prefix, asn, max_length, visible)
-            VALUES (%s, %s, %s, %s)
-        """, insert_rows)
+        self.copy_vrps(c, insert_rows)
 
-        # Insert new VRPs.
-        insert_data = [
+        # Insert new VRPs, feeding the COPY stream directly from the map to avoid
+        # materializing an intermediate list.
+        logging.info(f'Inserting {len(insert_vrps)} new VRPs')
+        self.copy_vrps(c, (
             (vrp.prefix, vrp.asn, vrp.max_length, visible_range)
             for vrp, visible_range in insert_vrps.items()
-        ]
-        logging.info(f'Inserting {len(insert_data)} new VRPs')
-        c.executemany("""
-            INSERT INTO vrps (prefix, asn, max_length, visible)
-            VALUES (%s, %s, %s, %s)
-        """, insert_data)
+        ))
 
 
 if __name__ == '__main__':